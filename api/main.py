@@ -2,33 +2,128 @@ import functions_framework
 from google.cloud import firestore
 from google.cloud import pubsub_v1
 from google.cloud import storage
+from google.api_core import exceptions
 import firebase_admin
 from firebase_admin import auth, credentials
+import cachetools
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import threading
+import time
 import uuid
-import json
+import orjson
 from datetime import datetime, timezone
 
+class _StructuredLogFormatter(logging.Formatter):
+    """Formats records as one-line JSON with a severity field.
+    
+    Cloud Logging parses JSON lines written to stdout/stderr and uses their
+    "severity" and "message" keys; plain text lines are ingested without a
+    severity.
+    """
+    
+    def format(self, record):
+        return orjson.dumps({
+            'severity': record.levelname,
+            'message': super().format(record),
+        }).decode()
+
+
+# Route logs through logging as structured JSON so Cloud Logging gets severities
+_DEBUG_ROUTER = os.environ.get('DEBUG_ROUTER') == '1'
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(_StructuredLogFormatter("%(message)s"))
+logging.basicConfig(level=logging.INFO, handlers=[_log_handler])
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG if _DEBUG_ROUTER else logging.INFO)
+
 # Lazy client initialization to avoid import-time credential errors
 _db_client = None
 _publisher_client = None
 _storage_client = None
 _firebase_app = None
+# Guard first-time construction so concurrent cold-start requests build one client each
+_db_lock = threading.Lock()
+_publisher_lock = threading.Lock()
+_storage_lock = threading.Lock()
+_firebase_lock = threading.Lock()
+_topic_checked = False
+_topic_lock = threading.Lock()
+
+# Small shared pool for overlapping independent blocking calls within a request
+_io_pool = ThreadPoolExecutor(max_workers=4)
+
+# Verified ID tokens, keyed by SHA-256 of the token -> (uid, exp). Entries live at most
+# 60s and are never served past the token's own expiry.
+_token_cache = cachetools.TTLCache(maxsize=10_000, ttl=60)
+_token_cache_lock = threading.Lock()
 
 PROJECT_ID = "documentformatterapp"
 TOPIC_NAME = "document-processing-topic"
+TOPIC_PATH = f"projects/{PROJECT_ID}/topics/{TOPIC_NAME}"
 BUCKET_NAME = "documentformatterapp.firebasestorage.app"
+# Seconds to wait for a job message publish before failing the request
+PUBLISH_TIMEOUT = 10
+
+# Response headers and constant error bodies, built once instead of per request
+_JSON_HEADERS = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
+_NOT_FOUND_HEADERS = {'Content-Type': 'application/json'}
+_OPTIONS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+    'Access-Control-Max-Age': '3600'
+}
+
+# Format profiles the worker knows about (see worker/formatting/format_profiles.py)
+_ALLOWED_STYLES = frozenset({"standard_clean", "compact_clean", "large_readable"})
+
+# Job fields that document_result can return via ?fields=, mapped to the stored
+# field paths each one reads (aliases read the field they mirror)
+_RESULT_FIELD_PATHS = {
+    'doc_id': (),
+    'job_id': (),
+    'state': ('state', 'status'),
+    'status': ('state', 'status'),
+    'progress': ('progress',),
+    'display_message': ('display_message',),
+    'formatted_text': ('formatted_text',),
+    'download_url': ('download_url',),
+    'url': ('download_url',),
+    'error': ('error',),
+    'owner_uid': ('owner_uid',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+    'version': ('version',),
+}
+
+_ERR_DB_UNAVAILABLE = orjson.dumps({'error': 'Database service unavailable'})
+_ERR_MISSING_STORAGE_PATH = orjson.dumps({'error': 'Missing storage_path'})
+_ERR_MISSING_DOC_ID = orjson.dumps({'error': 'missing doc_id'})
+_ERR_JOB_NOT_FOUND = orjson.dumps({'error': 'Job not found'})
+_ERR_JOB_EXISTS = orjson.dumps({'error': 'Job already exists'})
+_ERR_DIFFERENT_OWNER = orjson.dumps({'error': 'Job already exists with different owner'})
+_ERR_NOT_READY = orjson.dumps({'error': 'Document is not ready for download'})
+_ERR_NO_DOWNLOAD_URL = orjson.dumps({'error': 'Download URL not available'})
+_ERR_INVALID_STYLE = orjson.dumps({'error': f"Invalid style. Allowed values: {', '.join(sorted(_ALLOWED_STYLES))}"})
+_ERR_ROUTE_NOT_FOUND = orjson.dumps({'error': 'Not found'})
+_ERR_DEPRECATED = orjson.dumps({'error': 'This endpoint is deprecated. Use /v1/document_result instead.'})
 
 
 def get_db():
     """Lazy initialization of Firestore client. Returns None if credentials are missing."""
     global _db_client
     if _db_client is None:
-        try:
-            _db_client = firestore.Client()
-        except Exception as e:
-            # Log but don't crash - allows server to start without credentials
-            print(f"Warning: Could not initialize Firestore client: {str(e)}")
-            return None
+        with _db_lock:
+            if _db_client is None:
+                try:
+                    _db_client = firestore.Client()
+                except Exception as e:
+                    # Log but don't crash - allows server to start without credentials
+                    logger.warning("Could not initialize Firestore client: %s", e)
+                    return None
     return _db_client
 
 
@@ -36,32 +131,42 @@ def get_publisher():
     """Lazy initialization of Pub/Sub publisher client. Returns None if credentials are missing."""
     global _publisher_client
     if _publisher_client is None:
-        try:
-            _publisher_client = pubsub_v1.PublisherClient()
-        except Exception as e:
-            # Log but don't crash - allows server to start without credentials
-            print(f"Warning: Could not initialize Pub/Sub publisher: {str(e)}")
-            return None
+        with _publisher_lock:
+            if _publisher_client is None:
+                try:
+                    # Coalesce bursts of concurrent job messages into fewer publish RPCs.
+                    # Each request waits for its publish, so the batch window is added to
+                    # response time; keep it to a few milliseconds
+                    _publisher_client = pubsub_v1.PublisherClient(
+                        batch_settings=pubsub_v1.types.BatchSettings(
+                            max_messages=500,
+                            max_bytes=1024 * 1024,
+                            max_latency=0.005,
+                        ),
+                        publisher_options=pubsub_v1.types.PublisherOptions(
+                            enable_message_ordering=False,
+                        ),
+                    )
+                except Exception as e:
+                    # Log but don't crash - allows server to start without credentials
+                    logger.warning("Could not initialize Pub/Sub publisher: %s", e)
+                    return None
+        # One-time topic check on construction instead of on every request
+        ensure_topic_exists(_publisher_client)
     return _publisher_client
 
 
-def get_topic_path():
-    """Get the topic path, creating publisher if needed."""
-    publisher = get_publisher()
-    if publisher is None:
-        return None
-    return publisher.topic_path(PROJECT_ID, TOPIC_NAME)
-
-
 def get_storage():
     """Lazy initialization of Cloud Storage client. Returns None if credentials are missing."""
     global _storage_client
     if _storage_client is None:
-        try:
-            _storage_client = storage.Client()
-        except Exception as e:
-            print(f"Warning: Could not initialize Storage client: {str(e)}")
-            return None
+        with _storage_lock:
+            if _storage_client is None:
+                try:
+                    _storage_client = storage.Client()
+                except Exception as e:
+                    logger.warning("Could not initialize Storage client: %s", e)
+                    return None
     return _storage_client
 
 
@@ -69,17 +174,27 @@ def get_firebase_app():
     """Lazy initialization of Firebase Admin app. Returns None if credentials are missing."""
     global _firebase_app
     if _firebase_app is None:
-        try:
-            if not firebase_admin._apps:
-                _firebase_app = firebase_admin.initialize_app()
-            else:
-                _firebase_app = firebase_admin.get_app()
-        except Exception as e:
-            print(f"Warning: Could not initialize Firebase Admin: {str(e)}")
-            return None
+        with _firebase_lock:
+            if _firebase_app is None:
+                try:
+                    if not firebase_admin._apps:
+                        _firebase_app = firebase_admin.initialize_app()
+                    else:
+                        _firebase_app = firebase_admin.get_app()
+                except Exception as e:
+                    logger.warning("Could not initialize Firebase Admin: %s", e)
+                    return None
     return _firebase_app
 
 
+def _warmup():
+    """Construct all clients in the background so the first request doesn't pay for it."""
+    get_db()
+    get_publisher()
+    get_firebase_app()
+    get_storage()
+
+
 def verify_auth_token(request):
     """Verify Firebase Auth token from Authorization header. Returns (uid, error)."""
     auth_header = request.headers.get('Authorization', '')
@@ -90,6 +205,17 @@ def verify_auth_token(request):
     if not token:
         return None, "Missing token"
     
+    # Repeat requests with the same token skip the JWKS lookup + RSA signature check
+    cache_key = hashlib.sha256(token.encode('utf-8')).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(cache_key)
+    if cached is not None:
+        uid, exp = cached
+        if exp > time.time():
+            return uid, None
+        with _token_cache_lock:
+            _token_cache.pop(cache_key, None)
+    
     try:
         firebase_app = get_firebase_app()
         if firebase_app is None:
@@ -99,6 +225,8 @@ def verify_auth_token(request):
         uid = decoded_token.get('uid')
         if not uid:
             return None, "Token missing uid"
+        with _token_cache_lock:
+            _token_cache[cache_key] = (uid, decoded_token.get('exp', 0))
         return uid, None
     except Exception as e:
         return None, f"Invalid token: {str(e)}"
@@ -123,37 +251,59 @@ def verify_job_ownership(db, doc_id, owner_uid):
     except Exception as e:
         return False, f"Error verifying ownership: {str(e)}"
 
-def ensure_topic_exists():
-    """Ensure the Pub/Sub topic exists, create if it doesn't."""
-    publisher = get_publisher()
-    if publisher is None:
-        return  # Can't check topic without publisher
+def ensure_topic_exists(publisher=None):
+    """Ensure the Pub/Sub topic exists, create if it doesn't.
     
-    topic_path = get_topic_path()
-    if topic_path is None:
+    The check runs at most once per process; later calls return immediately.
+    """
+    global _topic_checked
+    if _topic_checked:
         return
     
-    try:
-        from google.api_core import exceptions
+    if publisher is None:
+        publisher = get_publisher()
+    if publisher is None:
+        return  # Can't check topic without publisher
+    
+    with _topic_lock:
+        if _topic_checked:
+            return
+        
         try:
-            publisher.get_topic(topic=topic_path)
-            print(f"Topic {TOPIC_NAME} exists")
-        except exceptions.NotFound:
-            # Topic doesn't exist, try to create it
             try:
-                publisher.create_topic(name=topic_path)
-                print(f"Created topic {TOPIC_NAME}")
-            except Exception as e:
-                print(f"Error creating topic: {str(e)}")
-                # Don't raise, just log - topic might be created by infrastructure
-    except Exception as e:
-        print(f"Error checking topic: {str(e)}")
-        # Don't raise - continue anyway
+                publisher.get_topic(topic=TOPIC_PATH)
+                logger.info("Topic %s exists", TOPIC_NAME)
+            except exceptions.NotFound:
+                # Topic doesn't exist, try to create it
+                try:
+                    publisher.create_topic(name=TOPIC_PATH)
+                    logger.info("Created topic %s", TOPIC_NAME)
+                except Exception as e:
+                    logger.warning("Error creating topic: %s", e)
+                    # Don't raise, just log - topic might be created by infrastructure
+        except Exception as e:
+            logger.warning("Error checking topic: %s", e)
+            # Don't raise - continue anyway
+        
+        # Don't repeat the check per request, even if it failed: the topic is
+        # normally managed by infrastructure and publish errors are handled anyway
+        _topic_checked = True
+
+
+def mark_enqueue_failed(doc_ref, error_msg):
+    """Mark a job as FAILED because its Pub/Sub message could not be published."""
+    doc_ref.update({
+        'state': 'FAILED',
+        'status': 'FAILED',  # Alias (keep identical)
+        'display_message': 'Failed to enqueue job',
+        'error': error_msg,
+        'updated_at': firestore.SERVER_TIMESTAMP
+    })
 
 
 def handle_process_document(request):
     """POST handler for process_document_stable endpoint."""
-    headers = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
+    headers = _JSON_HEADERS
     
     try:
         # Authentication is optional - if present, use it; otherwise set owner_uid to empty string
@@ -164,7 +314,7 @@ def handle_process_document(request):
         # Get Firestore client (lazy initialization)
         db = get_db()
         if db is None:
-            return (json.dumps({"error": "Database service unavailable"}), 500, headers)
+            return (_ERR_DB_UNAVAILABLE, 500, headers)
         
         # Parse JSON body safely (POST only)
         data = request.get_json(silent=True) or {}
@@ -176,40 +326,45 @@ def handle_process_document(request):
         style = data.get("style") or "standard_clean"  # Treat empty string/None as missing, default to standard_clean
         
         # Validate style against allowed values
-        allowed_styles = {"standard_clean", "compact_clean", "large_readable"}
-        if style not in allowed_styles:
-            return (json.dumps({"error": f"Invalid style. Allowed values: {', '.join(sorted(allowed_styles))}"}), 400, headers)
+        if style not in _ALLOWED_STYLES:
+            return (_ERR_INVALID_STYLE, 400, headers)
         
         if not storage_path:
-            return (json.dumps({"error": "Missing storage_path"}), 400, headers)
+            return (_ERR_MISSING_STORAGE_PATH, 400, headers)
         
         # Check if job already exists (idempotent creation)
         # If doc_id provided, use it; otherwise generate new
         doc_id = data.get('doc_id') or data.get('docId')
-        if not doc_id:
+        client_supplied = bool(doc_id)
+        if not client_supplied:
             doc_id = str(uuid.uuid4())
         
         doc_ref = db.collection('jobs').document(doc_id)
-        doc = doc_ref.get()
         
-        if doc.exists:
-            # Job already exists - return existing doc_id
-            existing_data = doc.to_dict()
-            # Only return if it belongs to the same user
-            if existing_data.get('owner_uid') == owner_uid:
-                state_value = existing_data.get('state', 'QUEUED')
-                return (json.dumps({
-                    "doc_id": doc_id,
-                    "job_id": doc_id,  # Alias
-                    "state": state_value,
-                    "status": state_value  # Alias
-                }), 200, headers)
-            else:
-                return (json.dumps({"error": "Job already exists with different owner"}), 409, headers)
+        publisher_future = None
+        if client_supplied:
+            # Only client-supplied IDs can collide, so only they pay for the read.
+            # Overlap it with publisher readiness (client + topic check on a cold start).
+            publisher_future = _io_pool.submit(get_publisher)
+            doc = doc_ref.get()
+            if doc.exists:
+                # Job already exists - return existing doc_id
+                existing_data = doc.to_dict()
+                # Only return if it belongs to the same user
+                if existing_data.get('owner_uid') == owner_uid:
+                    state_value = existing_data.get('state', 'QUEUED')
+                    return (orjson.dumps({
+                        "doc_id": doc_id,
+                        "job_id": doc_id,  # Alias
+                        "state": state_value,
+                        "status": state_value  # Alias
+                    }), 200, headers)
+                else:
+                    return (_ERR_DIFFERENT_OWNER, 409, headers)
         
         # Create new job document in jobs collection with new schema
         # Write both state and status for compatibility
-        doc_ref.set({
+        job_data = {
             'doc_id': doc_id,
             'job_id': doc_id,  # Alias for compatibility
             'storage_path': storage_path,
@@ -227,53 +382,43 @@ def handle_process_document(request):
             'created_at': firestore.SERVER_TIMESTAMP,
             'updated_at': firestore.SERVER_TIMESTAMP,
             'version': 'v1'
-        })
-        
-        # Ensure topic exists before publishing
-        try:
-            ensure_topic_exists()
-        except Exception as topic_error:
-            print(f"Topic check failed: {str(topic_error)}")
-            # Continue anyway, might still work
+        }
+        if client_supplied:
+            doc_ref.set(job_data)
+        else:
+            # Server-generated UUID: create() fails atomically on collision, no read needed
+            try:
+                doc_ref.create(job_data)
+            except exceptions.AlreadyExists:
+                return (_ERR_JOB_EXISTS, 409, headers)
         
-        # Get publisher and topic path (lazy initialization)
-        publisher = get_publisher()
-        topic_path = get_topic_path()
+        # Get publisher (lazy initialization)
+        publisher = publisher_future.result() if publisher_future is not None else get_publisher()
         
-        if publisher is not None and topic_path is not None:
+        if publisher is not None:
             message_data = {'doc_id': doc_id}
-            message_bytes = json.dumps(message_data).encode('utf-8')
+            message_bytes = orjson.dumps(message_data)
             
             try:
-                future = publisher.publish(topic_path, message_bytes)
-                message_id = future.result(timeout=10)  # Add timeout
-                print(f"Published message {message_id} for doc_id {doc_id} to topic {TOPIC_NAME}")
+                # Wait (bounded) for the publish before responding: once the response is
+                # sent, Cloud Functions throttles the instance's CPU, so a message still
+                # batched in the client could stay unsent and be lost on scale-down
+                future = publisher.publish(TOPIC_PATH, message_bytes)
+                message_id = future.result(timeout=PUBLISH_TIMEOUT)
+                logger.info("Published message %s for doc_id %s to topic %s", message_id, doc_id, TOPIC_NAME)
             except Exception as pubsub_error:
                 error_msg = f"Error publishing to Pub/Sub: {str(pubsub_error)}"
-                print(error_msg)
-                # Update job with error and set to FAILED
-                doc_ref.update({
-                    'state': 'FAILED',
-                    'status': 'FAILED',  # Alias (keep identical)
-                    'display_message': 'Failed to enqueue job',
-                    'error': error_msg,
-                    'updated_at': firestore.SERVER_TIMESTAMP
-                })
-                return (json.dumps({"error": error_msg}), 500, headers)
+                logger.warning(error_msg)
+                mark_enqueue_failed(doc_ref, error_msg)
+                return (orjson.dumps({"error": error_msg}), 500, headers)
         else:
             # Publisher unavailable - mark job as failed
             error_msg = "Pub/Sub publisher unavailable"
-            print(f"Warning: {error_msg}, marking job {doc_id} as FAILED")
-            doc_ref.update({
-                'state': 'FAILED',
-                'status': 'FAILED',  # Alias (keep identical)
-                'display_message': 'Failed to enqueue job',
-                'error': error_msg,
-                'updated_at': firestore.SERVER_TIMESTAMP
-            })
-            return (json.dumps({"error": error_msg}), 500, headers)
+            logger.warning("%s, marking job %s as FAILED", error_msg, doc_id)
+            mark_enqueue_failed(doc_ref, error_msg)
+            return (orjson.dumps({"error": error_msg}), 500, headers)
         
-        return (json.dumps({
+        return (orjson.dumps({
             "doc_id": doc_id,
             "job_id": doc_id,  # Alias
             "state": "QUEUED",
@@ -281,32 +426,66 @@ def handle_process_document(request):
         }), 200, headers)
         
     except Exception as e:
-        return (json.dumps({"error": str(e)}), 500, headers)
+        return (orjson.dumps({"error": str(e)}), 500, headers)
+
+
+def convert_timestamp(ts):
+    """Convert a Firestore timestamp value to an ISO 8601 string (None if missing)."""
+    if not ts:
+        return None
+    # Firestore returns DatetimeWithNanoseconds, a tz-aware datetime subclass
+    if isinstance(ts, datetime):
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return ts.isoformat()
+    if isinstance(ts, str):
+        return ts
+    # protobuf Timestamp
+    to_datetime = getattr(ts, 'ToDatetime', None)
+    if to_datetime is not None:
+        dt = to_datetime()
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.isoformat()
+    if isinstance(ts, (int, float)):
+        return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
+    return None
 
 
 def handle_document_result(request):
     """GET handler for document_result endpoint."""
-    headers = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
+    headers = _JSON_HEADERS
     
     # For GET requests, ONLY read from query string (NEVER parse JSON)
     doc_id = request.args.get('doc_id')
     
     # If doc_id still missing, return error
     if not doc_id or doc_id.strip() == '':
-        return (json.dumps({'error': 'missing doc_id'}), 400, headers)
+        return (_ERR_MISSING_DOC_ID, 400, headers)
     
     # Get Firestore client (lazy initialization)
     db = get_db()
     if db is None:
-        return (json.dumps({'error': 'Database service unavailable'}), 500, headers)
+        return (_ERR_DB_UNAVAILABLE, 500, headers)
+    
+    # Optional ?fields=state,progress projection so pollers don't fetch formatted_text
+    requested_fields = None
+    field_paths = None
+    fields_param = request.args.get('fields')
+    if fields_param:
+        requested_fields = {f.strip() for f in fields_param.split(',') if f.strip()}
+        unknown_fields = requested_fields - _RESULT_FIELD_PATHS.keys()
+        if unknown_fields:
+            return (orjson.dumps({'error': f"Invalid fields: {', '.join(sorted(unknown_fields))}"}), 400, headers)
+        field_paths = sorted({path for f in requested_fields for path in _RESULT_FIELD_PATHS[f]})
     
     try:
         # Read from Firestore: jobs/{doc_id} (new schema)
         doc_ref = db.collection('jobs').document(doc_id)
-        doc = doc_ref.get()
+        doc = doc_ref.get(field_paths=field_paths)
         
         if not doc.exists:
-            return (json.dumps({'error': 'Job not found'}), 404, headers)
+            return (_ERR_JOB_NOT_FOUND, 404, headers)
         
         # Document exists - extract data using new schema
         data = doc.to_dict()
@@ -315,25 +494,6 @@ def handle_document_result(request):
         created_at = data.get('created_at')
         updated_at = data.get('updated_at')
         
-        def convert_timestamp(ts):
-            if not ts:
-                return None
-            try:
-                if hasattr(ts, 'timestamp'):
-                    dt = datetime.fromtimestamp(ts.timestamp(), tz=timezone.utc)
-                    return dt.isoformat()
-                elif isinstance(ts, str):
-                    return ts
-                elif isinstance(ts, datetime):
-                    if ts.tzinfo is None:
-                        ts = ts.replace(tzinfo=timezone.utc)
-                    return ts.isoformat()
-                else:
-                    dt = datetime.fromtimestamp(float(ts), tz=timezone.utc)
-                    return dt.isoformat()
-            except:
-                return None
-        
         # Get values with fallbacks
         state_value = data.get('state', data.get('status', 'FAILED'))  # Support both
         download_url_value = data.get('download_url')
@@ -355,101 +515,107 @@ def handle_document_result(request):
             'version': data.get('version', 'v1')
         }
         
+        if requested_fields is not None:
+            response_data = {
+                key: value for key, value in response_data.items()
+                if key in requested_fields or key in ('doc_id', 'job_id')
+            }
+        
         # Return 200 with the job document
-        return (json.dumps(response_data), 200, headers)
+        return (orjson.dumps(response_data), 200, headers)
         
     except Exception as e:
         # Unexpected exception - return 500
         error_msg = str(e) if str(e) else 'Unexpected error'
-        print(f"Error in document_result: {error_msg}")
-        return (json.dumps({'error': error_msg}), 500, headers)
+        logger.exception("Error in document_result: %s", error_msg)
+        return (orjson.dumps({'error': error_msg}), 500, headers)
 
 
 def handle_document_download(request):
     """GET handler for document_download endpoint."""
-    headers = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
+    headers = _JSON_HEADERS
     
     # For GET requests, ONLY read from query string (NEVER parse JSON)
     doc_id = request.args.get('doc_id')
     
     # If doc_id still missing, return error
     if not doc_id or doc_id.strip() == '':
-        return (json.dumps({'error': 'missing doc_id'}), 400, headers)
+        return (_ERR_MISSING_DOC_ID, 400, headers)
     
     # Get Firestore client
     db = get_db()
     if db is None:
-        return (json.dumps({'error': 'Database service unavailable'}), 500, headers)
+        return (_ERR_DB_UNAVAILABLE, 500, headers)
     
-    # Get job document
+    # Get job document (only the fields needed here)
     doc_ref = db.collection('jobs').document(doc_id)
-    doc = doc_ref.get()
+    doc = doc_ref.get(field_paths=['state', 'download_url'])
     
     if not doc.exists:
-        return (json.dumps({'error': 'Job not found'}), 404, headers)
+        return (_ERR_JOB_NOT_FOUND, 404, headers)
     
     data = doc.to_dict()
     
     # Check if job is completed
     if data.get('state') != 'COMPLETED':
-        return (json.dumps({'error': 'Document is not ready for download'}), 400, headers)
+        return (_ERR_NOT_READY, 400, headers)
     
     # Get download_url from job document
     download_url = data.get('download_url')
     if not download_url:
-        return (json.dumps({'error': 'Download URL not available'}), 400, headers)
+        return (_ERR_NO_DOWNLOAD_URL, 400, headers)
     
     # Return JSON with both download_url and url aliases
-    return (json.dumps({
+    return (orjson.dumps({
         'download_url': download_url,
         'url': download_url  # Alias for compatibility
     }), 200, headers)
 
 
+# Exact (method, path) routes; both the bare and /api-prefixed paths are served
+_ROUTES = {
+    ('GET', '/v1/document_result'): handle_document_result,
+    ('GET', '/api/v1/document_result'): handle_document_result,
+    ('GET', '/v1/document_download'): handle_document_download,
+    ('GET', '/api/v1/document_download'): handle_document_download,
+    ('POST', '/process_document_stable'): handle_process_document,
+    ('POST', '/api/process_document_stable'): handle_process_document,
+}
+
+
 @functions_framework.http
 def process_document_stable(request):
     """
     Manual router entrypoint - NO Flask app, NO test_request_context, NO global JSON parsing.
     Routes purely by request.path + request.method.
     """
-    # Log request details
-    query_string = request.query_string.decode('utf-8') if request.query_string else ''
-    content_type = request.headers.get('Content-Type', '')
-    print(f"REQ method={request.method} path={request.path} ct={content_type} qs={query_string}")
+    # Log request details (opt-in via DEBUG_ROUTER=1)
+    if _DEBUG_ROUTER:
+        query_string = request.query_string.decode('utf-8') if request.query_string else ''
+        content_type = request.headers.get('Content-Type', '')
+        logger.debug("REQ method=%s path=%s ct=%s qs=%s",
+                     request.method, request.path, content_type, query_string)
     
     # Handle OPTIONS requests
     if request.method == 'OPTIONS':
-        headers = {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-            'Access-Control-Max-Age': '3600'
-        }
-        return ('', 204, headers)
+        return ('', 204, _OPTIONS_HEADERS)
     
     # Manual routing by path and method (NO JSON parsing until inside handlers)
-    path = request.path
-    
-    # GET /v1/document_result OR /api/v1/document_result
-    if request.method == 'GET' and (path == '/v1/document_result' or path == '/api/v1/document_result'):
-        return handle_document_result(request)
-    
-    # GET /v1/document_download OR /api/v1/document_download
-    if request.method == 'GET' and (path == '/v1/document_download' or path == '/api/v1/document_download'):
-        return handle_document_download(request)
-    
-    # POST /process_document_stable OR /api/process_document_stable
-    if request.method == 'POST' and (path == '/process_document_stable' or path == '/api/process_document_stable'):
-        return handle_process_document(request)
+    handler = _ROUTES.get((request.method, request.path))
+    if handler is not None:
+        return handler(request)
     
     # 404 for unmatched routes
-    headers = {'Content-Type': 'application/json'}
-    return (json.dumps({'error': 'Not found'}), 404, headers)
+    return (_ERR_ROUTE_NOT_FOUND, 404, _NOT_FOUND_HEADERS)
 
 
 # DEPRECATED: This endpoint is no longer used. Use /v1/document_result instead.
 @functions_framework.http
 def check_status(request):
     """DEPRECATED: Use /v1/document_result instead. This endpoint reads from old processing_jobs collection."""
-    headers = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
-    return (json.dumps({"error": "This endpoint is deprecated. Use /v1/document_result instead."}), 410, headers)
+    headers = _JSON_HEADERS
+    return (_ERR_DEPRECATED, 410, headers)
+
+
+# Warm up clients at import time, off the request path
+threading.Thread(target=_warmup, daemon=True).start()
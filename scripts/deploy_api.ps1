@@ -7,6 +7,9 @@ $FUNCTION_NAME = "api"
 $RUNTIME = "python313"
 $ENTRY_POINT = "process_document_stable"
 $SOURCE_DIR = "api"
+# Handlers are thread-safe and mostly wait on Firestore/Pub/Sub I/O, so let one
+# instance serve many requests at once (gunicorn threads must match concurrency)
+$CONCURRENCY = 80
 
 Write-Host "Deploying API function: $FUNCTION_NAME" -ForegroundColor Green
 Write-Host "Project: $PROJECT_ID" -ForegroundColor Cyan
@@ -21,6 +24,9 @@ gcloud functions deploy $FUNCTION_NAME `
     --entry-point=$ENTRY_POINT `
     --trigger-http `
     --allow-unauthenticated `
+    --cpu=1 `
+    --concurrency=$CONCURRENCY `
+    --update-env-vars=THREADS=$CONCURRENCY `
     --project=$PROJECT_ID
 
 if ($LASTEXITCODE -eq 0) {
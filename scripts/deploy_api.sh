@@ -8,6 +8,9 @@ FUNCTION_NAME="api"
 RUNTIME="python313"
 ENTRY_POINT="process_document_stable"
 SOURCE_DIR="api"
+# Handlers are thread-safe and mostly wait on Firestore/Pub/Sub I/O, so let one
+# instance serve many requests at once (gunicorn threads must match concurrency)
+CONCURRENCY=80
 
 echo "Deploying API function: $FUNCTION_NAME"
 echo "Project: $PROJECT_ID"
@@ -22,6 +25,9 @@ gcloud functions deploy $FUNCTION_NAME \
     --entry-point=$ENTRY_POINT \
     --trigger-http \
     --allow-unauthenticated \
+    --cpu=1 \
+    --concurrency=$CONCURRENCY \
+    --update-env-vars=THREADS=$CONCURRENCY \
     --project=$PROJECT_ID
 
 if [ $? -eq 0 ]; then
@@ -8,6 +8,7 @@ $RUNTIME = "python313"
 $ENTRY_POINT = "process_document_worker"
 $SOURCE_DIR = "worker"
 $TOPIC_NAME = "document-processing-topic"
+# PYTHONOPTIMIZE=1 strips debug-only checks (asserts, if __debug__ blocks) at compile time
 
 Write-Host "Deploying Worker function: $FUNCTION_NAME" -ForegroundColor Green
 Write-Host "Project: $PROJECT_ID" -ForegroundColor Cyan
@@ -22,6 +23,7 @@ gcloud functions deploy $FUNCTION_NAME `
     --source=$SOURCE_DIR `
     --entry-point=$ENTRY_POINT `
     --trigger-topic=$TOPIC_NAME `
+    --update-env-vars=PYTHONOPTIMIZE=1 `
     --project=$PROJECT_ID
 
 if ($LASTEXITCODE -eq 0) {
@@ -9,6 +9,7 @@ RUNTIME="python313"
 ENTRY_POINT="process_document_worker"
 SOURCE_DIR="worker"
 TOPIC_NAME="document-processing-topic"
+# PYTHONOPTIMIZE=1 strips debug-only checks (asserts, if __debug__ blocks) at compile time
 
 echo "Deploying Worker function: $FUNCTION_NAME"
 echo "Project: $PROJECT_ID"
@@ -23,6 +24,7 @@ gcloud functions deploy $FUNCTION_NAME \
     --source=$SOURCE_DIR \
     --entry-point=$ENTRY_POINT \
     --trigger-topic=$TOPIC_NAME \
+    --update-env-vars=PYTHONOPTIMIZE=1 \
     --project=$PROJECT_ID
 
 if [ $? -eq 0 ]; then
@@ -3,8 +3,97 @@
 from docx import Document
 from docx.shared import Pt, Cm
 from docx.enum.text import WD_LINE_SPACING
-from docx.oxml.ns import qn
+from docx.oxml import OxmlElement
+from docx.oxml.ns import nsmap, qn
+from docx.text.paragraph import Paragraph
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.opc.pkgwriter import PackageWriter
+from copy import deepcopy
+from functools import lru_cache
+from lxml import etree
+import hashlib
 import io
+import zipfile
+import zlib
+
+
+# Clark-notation tag/attribute names, resolved once instead of per run
+_W_P = qn('w:p')
+_W_T = qn('w:t')
+_W_R = qn('w:r')
+_W_PPR = qn('w:pPr')
+_W_RPR = qn('w:rPr')
+_W_ASCII = qn('w:ascii')
+_W_HANSI = qn('w:hAnsi')
+_W_EASTASIA = qn('w:eastAsia')
+_W_CS = qn('w:cs')
+_W_SPACING = qn('w:spacing')
+_W_VAL = qn('w:val')
+_W_BEFORE = qn('w:before')
+_W_AFTER = qn('w:after')
+_W_LINE = qn('w:line')
+_W_LINERULE = qn('w:lineRule')
+
+# Body paragraphs plus paragraphs of top-level table cells, excluding cells that
+# continue a vertical merge (w:vMerge with no w:val, or w:val="continue")
+_PARAGRAPHS_XPATH = etree.XPath(
+    './w:p'
+    ' | ./w:tbl/w:tr/w:tc[not(w:tcPr/w:vMerge[not(@w:val) or @w:val="continue"])]/w:p',
+    namespaces={'w': nsmap['w']},
+)
+
+# Text-bearing run children of a paragraph, in document order, including runs
+# inside hyperlinks (the same elements CT_P.text / CT_R.text read)
+_PARAGRAPH_TEXT_XPATH = etree.XPath(
+    '(w:r | w:hyperlink/w:r)/*[self::w:t or self::w:tab or self::w:br or self::w:cr'
+    ' or self::w:noBreakHyphen or self::w:ptab]',
+    namespaces={'w': nsmap['w']},
+)
+
+# Marker for documents already formatted (see has_format_marker). It is kept in a
+# custom XML part of its own, tagged with this namespace, so no user-visible
+# document property is touched
+_FORMAT_MARKER_PREFIX = 'docfmt:'
+_FORMAT_MARKER_NS = 'urn:documentformatter:format-marker'
+_FORMAT_MARKER_TAG = f'{{{_FORMAT_MARKER_NS}}}marker'
+
+# zlib level for saved packages. Word itself writes "SuperFast" (level 1);
+# python-docx's default of 6 costs far more CPU for a few percent in size.
+_DOCX_COMPRESSLEVEL = zlib.Z_BEST_SPEED
+
+# Child order of w:rPr and w:pPr (CT_RPr / CT_PPr in the WordprocessingML schema)
+_RPR_CHILD_ORDER = (
+    'w:rStyle', 'w:rFonts', 'w:b', 'w:bCs', 'w:i', 'w:iCs', 'w:caps', 'w:smallCaps',
+    'w:strike', 'w:dstrike', 'w:outline', 'w:shadow', 'w:emboss', 'w:imprint', 'w:noProof',
+    'w:snapToGrid', 'w:vanish', 'w:webHidden', 'w:color', 'w:spacing', 'w:w', 'w:kern',
+    'w:position', 'w:sz', 'w:szCs', 'w:highlight', 'w:u', 'w:effect', 'w:bdr', 'w:shd',
+    'w:fitText', 'w:vertAlign', 'w:rtl', 'w:cs', 'w:em', 'w:lang', 'w:eastAsianLayout',
+    'w:specVanish', 'w:oMath', 'w:rPrChange'
+)
+_PPR_CHILD_ORDER = (
+    'w:pStyle', 'w:keepNext', 'w:keepLines', 'w:pageBreakBefore', 'w:framePr',
+    'w:widowControl', 'w:numPr', 'w:suppressLineNumbers', 'w:pBdr', 'w:shd', 'w:tabs',
+    'w:suppressAutoHyphens', 'w:kinsoku', 'w:wordWrap', 'w:overflowPunct', 'w:topLinePunct',
+    'w:autoSpaceDE', 'w:autoSpaceDN', 'w:bidi', 'w:adjustRightInd', 'w:snapToGrid',
+    'w:spacing', 'w:ind', 'w:contextualSpacing', 'w:mirrorIndents', 'w:suppressOverlap',
+    'w:jc', 'w:textDirection', 'w:textAlignment', 'w:textboxTightWrap', 'w:outlineLvl',
+    'w:divId', 'w:cnfStyle', 'w:rPr', 'w:sectPr', 'w:pPrChange'
+)
+
+
+def _successors(child_order, tag):
+    """Clark names of the children that must come after tag, as a frozenset."""
+    return frozenset(qn(t) for t in child_order[child_order.index(tag) + 1:])
+
+
+# Tags that must follow each element the formatter writes, resolved once so the
+# per-run insert is a set lookup instead of python-docx's per-call qn() of every successor
+_RFONTS_SUCCESSORS = _successors(_RPR_CHILD_ORDER, 'w:rFonts')
+_SZ_SUCCESSORS = _successors(_RPR_CHILD_ORDER, 'w:sz')
+_SZCS_SUCCESSORS = _successors(_RPR_CHILD_ORDER, 'w:szCs')
+_SPACING_SUCCESSORS = _successors(_PPR_CHILD_ORDER, 'w:spacing')
 
 
 def set_section_margins(section, margins):
@@ -44,51 +133,129 @@ def apply_normal_style(paragraph, font_name, font_size, line_spacing,
         spacing_before: Pt value
         spacing_after: Pt value
     """
-    # Set paragraph spacing
-    paragraph_format = paragraph.paragraph_format
-    paragraph_format.space_before = spacing_before
-    paragraph_format.space_after = spacing_after
-    paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
-    paragraph_format.line_spacing = line_spacing
+    apply_normal_style_to_elements(
+        (paragraph._p,), font_name, font_size, line_spacing, spacing_before, spacing_after
+    )
+
+
+def apply_normal_style_to_elements(paragraph_elements, font_name, font_size, line_spacing,
+                                   spacing_before, spacing_after):
+    """Apply Normal style formatting to many <w:p> elements in one pass.
+    
+    Same effect as apply_normal_style() on each paragraph, but the template
+    elements are looked up once for the whole batch.
+    
+    Args:
+        paragraph_elements: iterable of CT_P elements (see collect_paragraph_elements)
+        font_name: str (e.g., "Calibri")
+        font_size: Pt value
+        line_spacing: float (e.g., 1.15)
+        spacing_before: Pt value
+        spacing_after: Pt value
+    """
+    # Paragraph spacing is set by swapping in a prebuilt <w:spacing> element.
+    # Only w:spacing is replaced, so pStyle, numbering, alignment etc. survive.
+    spacing = _paragraph_spacing_element(spacing_before, spacing_after, line_spacing)
     
-    # Apply font to all runs in the paragraph
     # CRITICAL: Must override explicit run-level formatting (many docs have explicit font sizes)
-    # Use OXML to ensure font is properly serialized and overrides existing formatting
-    for run in paragraph.runs:
-        # Set font properties via python-docx API (this should override existing formatting)
-        run.font.name = font_name
-        run.font.size = font_size
+    # Write the OXML directly so explicit run formatting is overridden. The rFonts/sz/szCs
+    # elements are built once per font and copied into each run, replacing any existing ones.
+    rFonts, sz, szCs = _run_font_elements(font_name, int(font_size.pt * 2))
+    
+    for p in paragraph_elements:
+        # w:pPr / w:rPr are always the first child of w:p / w:r
+        pPr = p.find(_W_PPR)
+        if pPr is None:
+            pPr = p.makeelement(_W_PPR)
+            p.insert(0, pPr)
+        _replace_or_insert(pPr, deepcopy(spacing), _SPACING_SUCCESSORS)
         
-        # Force font serialization via OXML to ensure it's written to XML
-        # This ensures explicit run formatting is overridden
-        rPr = run._element.get_or_add_rPr()
+        for r in p.iterchildren(_W_R):
+            rPr = r.find(_W_RPR)
+            if rPr is None:
+                rPr = r.makeelement(_W_RPR)
+                r.insert(0, rPr)
+            _replace_or_insert(rPr, deepcopy(rFonts), _RFONTS_SUCCESSORS)
+            _replace_or_insert(rPr, deepcopy(sz), _SZ_SUCCESSORS)
+            _replace_or_insert(rPr, deepcopy(szCs), _SZCS_SUCCESSORS)
+
+
+def collect_paragraph_elements(document):
+    """Collect every body and table-cell <w:p> element with a single XPath query.
+    
+    Covers the paragraphs apply_format_only has always formatted: those directly
+    in the body and those directly in a top-level table cell. Vertical-merge
+    continuation cells are skipped (their content lives in the cell above).
+    
+    Args:
+        document: docx.Document
         
-        # Handle rFonts - find existing or create, then set all script variants
-        rFonts = rPr.find(qn('w:rFonts'))
-        if rFonts is None:
-            rFonts = rPr.makeelement(qn('w:rFonts'))
-            rPr.append(rFonts)
-        # Overwrite existing values to ensure font is set
-        rFonts.set(qn('w:ascii'), font_name)
-        rFonts.set(qn('w:hAnsi'), font_name)
-        rFonts.set(qn('w:eastAsia'), font_name)
-        rFonts.set(qn('w:cs'), font_name)
+    Returns:
+        list: CT_P elements in document order
+    """
+    return _PARAGRAPHS_XPATH(document.element.body)
+
+
+@lru_cache(maxsize=None)
+def _paragraph_spacing_element(spacing_before, spacing_after, line_spacing):
+    """Build a template w:spacing element for the given paragraph spacing.
+    
+    The element is produced by python-docx's own ParagraphFormat setters on a
+    scratch paragraph, so its attributes match what those setters would write.
+    
+    Args:
+        spacing_before: Pt value
+        spacing_after: Pt value
+        line_spacing: float multiple (e.g., 1.15)
         
-        # Handle font size - find existing or create, then overwrite value
-        sz = rPr.find(qn('w:sz'))
-        if sz is None:
-            sz = rPr.makeelement(qn('w:sz'))
-            rPr.append(sz)
-        # font_size is a Pt object, convert to half-points (14pt = 28 half-points)
-        half_points = int(font_size.pt * 2)
-        sz.set(qn('w:val'), str(half_points))  # This overwrites existing value
+    Returns:
+        w:spacing element, to be deep-copied into each paragraph
+    """
+    scratch = OxmlElement('w:p')
+    paragraph_format = Paragraph(scratch, None).paragraph_format
+    paragraph_format.space_before = spacing_before
+    paragraph_format.space_after = spacing_after
+    paragraph_format.line_spacing_rule = WD_LINE_SPACING.MULTIPLE
+    paragraph_format.line_spacing = line_spacing
+    return scratch.pPr.spacing
+
+
+@lru_cache(maxsize=None)
+def _run_font_elements(font_name, half_points):
+    """Build template rFonts, sz and szCs elements for a font name and size.
+    
+    Args:
+        font_name: str (e.g., "Calibri")
+        half_points: int font size in half-points (14pt = 28 half-points)
         
-        # Handle complex script size - find existing or create, then overwrite
-        szCs = rPr.find(qn('w:szCs'))
-        if szCs is None:
-            szCs = rPr.makeelement(qn('w:szCs'))
-            rPr.append(szCs)
-        szCs.set(qn('w:val'), str(half_points))  # This overwrites existing value
+    Returns:
+        tuple: (rFonts, sz, szCs) elements, to be deep-copied into each run
+    """
+    font_attrs = {attr: font_name for attr in (_W_ASCII, _W_HANSI, _W_EASTASIA, _W_CS)}
+    size_attrs = {_W_VAL: str(half_points)}
+    return (
+        OxmlElement('w:rFonts', attrs=font_attrs),
+        OxmlElement('w:sz', attrs=size_attrs),
+        OxmlElement('w:szCs', attrs=size_attrs),
+    )
+
+
+def _replace_or_insert(parent, element, successors):
+    """Put element into parent at its schema position, in one pass over the children.
+    
+    Replaces the existing child with the same tag if there is one; otherwise inserts
+    element before the first child whose tag is in successors, or appends it.
+    """
+    tag = element.tag
+    for child in parent:
+        child_tag = child.tag
+        if child_tag == tag:
+            parent.replace(child, element)
+            return
+        if child_tag in successors:
+            child.addprevious(element)
+            return
+    parent.append(element)
 
 
 def update_normal_style_definition(document, font_name, font_size, line_spacing,
@@ -108,76 +275,79 @@ def update_normal_style_definition(document, font_name, font_size, line_spacing,
         return
     
     normal_style = styles['Normal']
+    style_element = normal_style._element
+    
+    # The profile's rFonts/sz/szCs/spacing are prebuilt once per profile values and
+    # spliced into the style; the rest of Normal (lang, color, ...) is left alone
+    rFonts, sz, szCs = _run_font_elements(font_name, int(font_size.pt * 2))
+    spacing = _style_spacing_element(spacing_before, spacing_after, line_spacing)
+    
+    # Skip all writes when the style already carries the target values
+    # (common for documents produced from the same template, or re-runs)
+    if _normal_style_matches(style_element, rFonts, sz, szCs, spacing):
+        return
     
     # Update font in style definition
     try:
-        font = normal_style.font
-        font.name = font_name
-        font.size = font_size
-        
-        # Force font serialization via OXML
-        style_element = normal_style._element
-        rPr = style_element.find(qn('w:rPr'))
-        if rPr is None:
-            rPr = style_element.makeelement(qn('w:rPr'))
-            style_element.append(rPr)
-        
-        rFonts = rPr.find(qn('w:rFonts'))
-        if rFonts is None:
-            rFonts = rPr.makeelement(qn('w:rFonts'))
-            rPr.append(rFonts)
-        rFonts.set(qn('w:ascii'), font_name)
-        rFonts.set(qn('w:hAnsi'), font_name)
-        rFonts.set(qn('w:eastAsia'), font_name)
-        rFonts.set(qn('w:cs'), font_name)
-        
-        # Set font size (convert Pt to half-points: 11pt = 22 half-points)
-        sz = rPr.find(qn('w:sz'))
-        if sz is None:
-            sz = rPr.makeelement(qn('w:sz'))
-            rPr.append(sz)
-        # font_size is a Pt object, convert to half-points
-        half_points = int(font_size.pt * 2)
-        sz.set(qn('w:val'), str(half_points))
-        
-        szCs = rPr.find(qn('w:szCs'))
-        if szCs is None:
-            szCs = rPr.makeelement(qn('w:szCs'))
-            rPr.append(szCs)
-        szCs.set(qn('w:val'), str(half_points))
+        rPr = style_element.get_or_add_rPr()
+        _replace_or_insert(rPr, deepcopy(rFonts), _RFONTS_SUCCESSORS)
+        _replace_or_insert(rPr, deepcopy(sz), _SZ_SUCCESSORS)
+        _replace_or_insert(rPr, deepcopy(szCs), _SZCS_SUCCESSORS)
     except Exception as e:
         print(f"Warning: Could not update Normal style font: {e}")
     
     # Update paragraph format in style definition
     try:
-        pPr = normal_style._element.find(qn('w:pPr'))
-        if pPr is None:
-            pPr = normal_style._element.makeelement(qn('w:pPr'))
-            normal_style._element.insert(0, pPr)
-        
-        # Set spacing
-        spacing = pPr.find(qn('w:spacing'))
-        if spacing is None:
-            spacing = pPr.makeelement(qn('w:spacing'))
-            pPr.append(spacing)
-        
-        # Convert Pt to twips (1 pt = 20 twips)
-        # spacing_before and spacing_after are Pt objects
-        spacing.set(qn('w:before'), str(int(spacing_before.pt * 20)))
-        spacing.set(qn('w:after'), str(int(spacing_after.pt * 20)))
-        
-        # Set line spacing (1.0 = single, stored as 240 twips per line)
-        if line_spacing == 1.0:
-            spacing.set(qn('w:line'), '240')
-            spacing.set(qn('w:lineRule'), 'auto')
-        else:
-            # Multiple line spacing
-            spacing.set(qn('w:line'), str(int(line_spacing * 240)))
-            spacing.set(qn('w:lineRule'), 'auto')
+        pPr = style_element.get_or_add_pPr()
+        _replace_or_insert(pPr, deepcopy(spacing), _SPACING_SUCCESSORS)
     except Exception as e:
         print(f"Warning: Could not update Normal style paragraph format: {e}")
 
 
+@lru_cache(maxsize=None)
+def _style_spacing_element(spacing_before, spacing_after, line_spacing):
+    """Build the template w:spacing element written into the Normal style.
+    
+    Args:
+        spacing_before: Pt value
+        spacing_after: Pt value
+        line_spacing: float multiple (1.0 = single = 240 twips per line)
+        
+    Returns:
+        w:spacing element, to be deep-copied into the style
+    """
+    # Convert Pt to twips (1 pt = 20 twips)
+    return OxmlElement('w:spacing', attrs={
+        _W_BEFORE: str(int(spacing_before.pt * 20)),
+        _W_AFTER: str(int(spacing_after.pt * 20)),
+        _W_LINE: str(int(line_spacing * 240)),
+        _W_LINERULE: 'auto',
+    })
+
+
+def _normal_style_matches(style_element, *templates):
+    """Check whether a style element already carries the given template elements.
+    
+    Args:
+        style_element: w:style element
+        templates: rFonts, sz, szCs and spacing elements the style should contain
+        
+    Returns:
+        bool: True if no writes are needed
+    """
+    rPr = style_element.rPr
+    pPr = style_element.pPr
+    if rPr is None or pPr is None:
+        return False
+    
+    for template in templates:
+        parent = pPr if template.tag == _W_SPACING else rPr
+        element = parent.find(template.tag)
+        if element is None or any(element.get(k) != v for k, v in template.attrib.items()):
+            return False
+    return True
+
+
 def normalize_heading_styles(document):
     """Normalize Heading 1, 2, 3 styles if paragraphs already use them.
     Only modifies paragraphs that already have heading styles.
@@ -201,44 +371,211 @@ def normalize_heading_styles(document):
 def extract_plain_text(document):
     """Extract plain text from a document, preserving paragraph structure.
     
+    Reads the body's w:p elements directly instead of building a Paragraph
+    wrapper for each (same paragraphs and text as document.paragraphs). Each
+    paragraph's text-bearing run children are fetched with one compiled XPath,
+    rather than the per-run queries behind CT_P.text.
+    
     Args:
         document: docx.Document
         
     Returns:
         str: Plain text with newlines between paragraphs
     """
-    paragraphs = []
-    for para in document.paragraphs:
-        text = para.text.strip()
-        if text:
-            paragraphs.append(text)
-    return '\n'.join(paragraphs)
+    body = document.element.body
+    return '\n'.join(t for t in (_paragraph_text(p).strip() for p in body.iterchildren(_W_P)) if t)
+
+
+def _paragraph_text(p):
+    """Same result as CT_P.text: w:t text, with w:tab, w:br etc. rendered by str()."""
+    return ''.join(
+        (e.text or '') if e.tag == _W_T else str(e)
+        for e in _PARAGRAPH_TEXT_XPATH(p)
+    )
+
+
+def _marker_content_partnames(document):
+    """Partnames of the parts covered by the format marker's content hash.
+    
+    The main document part and, if present, its styles part.
+    """
+    partnames = [document.part.partname]
+    try:
+        partnames.append(document.part.part_related_by(RT.STYLES).partname)
+    except KeyError:
+        pass
+    return partnames
+
+
+def _content_hash(blobs):
+    content = hashlib.blake2b(digest_size=8)
+    for blob in blobs:
+        content.update(blob)
+    return content.hexdigest()
 
 
-def docx_to_bytes(document):
+def _format_marker_part(document):
+    """Return the custom XML part holding the format marker, or None."""
+    for rel in document.part.rels.values():
+        if rel.reltype != RT.CUSTOM_XML or rel.is_external:
+            continue
+        blob = rel.target_part.blob
+        # Cheap byte check first; other custom XML parts are not parsed
+        if not blob or _FORMAT_MARKER_NS.encode() not in blob:
+            continue
+        try:
+            root = etree.fromstring(blob)
+        except etree.XMLSyntaxError:
+            continue
+        if root.tag == _FORMAT_MARKER_TAG:
+            return rel.target_part
+    return None
+
+
+def _format_marker_blob(marker):
+    root = etree.Element(_FORMAT_MARKER_TAG, nsmap={None: _FORMAT_MARKER_NS})
+    root.text = marker
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _get_or_add_format_marker_part(document):
+    """Return the document's format marker part, adding an empty one if missing.
+    
+    The part is a custom XML item related from the main document part, so core
+    properties (title, keywords, ...) are left alone and docProps/core.xml is
+    not created for inputs that lack it.
+    """
+    part = _format_marker_part(document)
+    if part is None:
+        package = document.part.package
+        partname = PackURI(package.next_partname('/customXml/item%d.xml'))
+        part = Part(partname, CT.XML, _format_marker_blob(None), package)
+        document.part.relate_to(part, RT.CUSTOM_XML)
+    return part
+
+
+def get_format_marker(document):
+    """Return the format marker stored in the document, or None."""
+    part = _format_marker_part(document)
+    if part is None:
+        return None
+    return etree.fromstring(part.blob).text
+
+
+def has_format_marker(document, docx_input, profile_fingerprint):
+    """Check whether a DOCX was formatted with a profile and not edited since.
+    
+    The marker (written by docx_to_bytes(..., format_fingerprint=...)) pairs the
+    profile fingerprint with a hash of the main document and styles XML as they
+    were saved. The hash is checked against the raw zip members of docx_input,
+    so no part is serialized again.
+    
+    Args:
+        document: docx.Document loaded from docx_input
+        docx_input: the DOCX bytes or seekable binary stream
+        profile_fingerprint: str (FormatProfile.fingerprint)
+        
+    Returns:
+        bool
+    """
+    marker = get_format_marker(document)
+    prefix = f"{_FORMAT_MARKER_PREFIX}{profile_fingerprint}:"
+    if not marker or not marker.startswith(prefix):
+        return False
+    source = docx_input if hasattr(docx_input, 'read') else io.BytesIO(docx_input)
+    with zipfile.ZipFile(source) as zf:
+        try:
+            blobs = [zf.read(partname.membername) for partname in _marker_content_partnames(document)]
+        except KeyError:
+            return False
+    return marker == prefix + _content_hash(blobs)
+
+
+class _ZipPartWriter:
+    """Physical package writer with a configurable DEFLATE level.
+    
+    Stands in for python-docx's _ZipPkgWriter, which always uses DEFLATE at the
+    default level.
+    """
+    
+    def __init__(self, stream, compresslevel, captured_partnames=()):
+        self._zipf = zipfile.ZipFile(
+            stream, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=compresslevel
+        )
+        # Blobs of these parts are kept as written (see _save_package)
+        self.captured = dict.fromkeys(captured_partnames)
+    
+    def write(self, pack_uri, blob):
+        if pack_uri in self.captured:
+            self.captured[pack_uri] = blob
+        self._zipf.writestr(pack_uri.membername, blob)
+    
+    def close(self):
+        self._zipf.close()
+
+
+def _save_package(document, stream, compresslevel, format_fingerprint=None):
+    """Save document's package to stream, mirroring OpcPackage.save().
+    
+    With format_fingerprint, the format marker part is written last, holding the
+    fingerprint and a hash of the main document and styles blobs exactly as
+    they were just written.
+    """
+    package = document.part.package
+    marker_part = None
+    captured_partnames = ()
+    if format_fingerprint is not None:
+        marker_part = _get_or_add_format_marker_part(document)
+        captured_partnames = _marker_content_partnames(document)
+    
+    for part in package.parts:
+        part.before_marshal()
+    
+    writer = _ZipPartWriter(stream, compresslevel, captured_partnames)
+    parts = list(package.parts)
+    PackageWriter._write_content_types_stream(writer, parts)
+    PackageWriter._write_pkg_rels(writer, package.rels)
+    if marker_part is None:
+        PackageWriter._write_parts(writer, parts)
+    else:
+        PackageWriter._write_parts(writer, [part for part in parts if part is not marker_part])
+        content_hash = _content_hash(writer.captured[partname] for partname in captured_partnames)
+        marker_part._blob = _format_marker_blob(
+            f"{_FORMAT_MARKER_PREFIX}{format_fingerprint}:{content_hash}"
+        )
+        PackageWriter._write_parts(writer, [marker_part])
+    writer.close()
+
+
+def docx_to_bytes(document, compresslevel=_DOCX_COMPRESSLEVEL, format_fingerprint=None):
     """Convert a Document to bytes.
     
     Args:
         document: docx.Document
+        compresslevel: zlib level for the zip parts (default 1, as Word uses)
+        format_fingerprint: if given (FormatProfile.fingerprint), record in the
+            output that it was formatted with that profile (see has_format_marker)
         
     Returns:
         bytes: DOCX file content
     """
     buffer = io.BytesIO()
-    document.save(buffer)
-    buffer.seek(0)
+    _save_package(document, buffer, compresslevel, format_fingerprint)
+    # getvalue() hands back BytesIO's own buffer when nothing else references it
     return buffer.getvalue()
 
 
 def bytes_to_docx(docx_bytes):
-    """Load a Document from bytes.
+    """Load a Document from bytes or a binary stream.
     
     Args:
-        docx_bytes: bytes
+        docx_bytes: bytes, or a readable, seekable binary file-like object
+            (e.g. a BytesIO the caller downloaded into), which is read in place
+            rather than copied into a new buffer
         
     Returns:
         docx.Document
     """
-    buffer = io.BytesIO(docx_bytes)
-    return Document(buffer)
-
+    if hasattr(docx_bytes, 'read'):
+        return Document(docx_bytes)
+    return Document(io.BytesIO(docx_bytes))
@@ -1,7 +1,15 @@
 """Formatting profiles for DOCX format-only mode."""
 
+import hashlib
+
 from docx.shared import Pt, Cm, Inches
 from docx.enum.text import WD_LINE_SPACING
+from docx.oxml.ns import qn
+
+
+# Version of the formatting logic. Bump it whenever the engine formats documents
+# differently, so outputs marked by an older engine are formatted again.
+FORMAT_ENGINE_VERSION = 1
 
 
 class FormatProfile:
@@ -14,11 +22,20 @@ class FormatProfile:
         self.page_width = page_width
         self.page_height = page_height
         self.margins = margins  # dict with 'top', 'bottom', 'left', 'right' as cm floats
+        # w:pgMar attributes (twips strings), converted once via Cm() since profiles
+        # are shared module-level constants; Cm(2.0).twips == 1134, as python-docx writes
+        self.margin_attrs = {qn(f'w:{side}'): str(Cm(value).twips) for side, value in margins.items()}
         self.normal_font_name = normal_font_name
         self.normal_font_size = normal_font_size
         self.line_spacing = line_spacing
         self.paragraph_spacing_before = paragraph_spacing_before
         self.paragraph_spacing_after = paragraph_spacing_after
+        # Short stable hash of the engine version and every setting, recorded in
+        # formatted documents so a re-run with the same profile can be recognised
+        settings = (FORMAT_ENGINE_VERSION, name, page_width, page_height, sorted(margins.items()), normal_font_name,
+                    normal_font_size, line_spacing, paragraph_spacing_before,
+                    paragraph_spacing_after)
+        self.fingerprint = hashlib.blake2b(repr(settings).encode(), digest_size=8).hexdigest()
 
 
 # Standard clean profile: A4, 2.54cm margins, Calibri 11, 1.15 line spacing
@@ -8,7 +8,7 @@ import io
 import zipfile
 import xml.etree.ElementTree as ET
 
-from formatting.formatter_engine import apply_format_only
+from formatting.formatter_engine import apply_format_only, apply_format_only_batch
 from formatting.format_profiles import STANDARD_CLEAN, COMPACT_CLEAN, LARGE_READABLE
 from formatting.docx_utils import extract_plain_text, bytes_to_docx, docx_to_bytes
 
@@ -146,6 +146,23 @@ class TestFormatOnly(unittest.TestCase):
         doc_after = bytes_to_docx(formatted_bytes)
         self.assertIsNotNone(doc_after)
     
+    def test_blank_document_keeps_own_properties(self):
+        """Test that a blank input is formatted in place and keeps its own properties."""
+        from docx.enum.section import WD_ORIENT
+        doc = Document()
+        doc.sections[0].orientation = WD_ORIENT.LANDSCAPE
+        doc.core_properties.title = "Brief"
+        doc.core_properties.author = "Client"
+
+        formatted_bytes, extracted_text = apply_format_only(docx_to_bytes(doc), "large_readable")
+
+        self.assertEqual(extracted_text, "")
+        doc_after = bytes_to_docx(formatted_bytes)
+        self.assertEqual(doc_after.sections[0].orientation, WD_ORIENT.LANDSCAPE)
+        self.assertEqual(doc_after.sections[0].top_margin, Cm(LARGE_READABLE.margins['top']))
+        self.assertEqual(doc_after.core_properties.title, "Brief")
+        self.assertEqual(doc_after.core_properties.author, "Client")
+
     def test_table_formatting(self):
         """Test that tables are formatted but text preserved."""
         doc = Document()
@@ -162,7 +179,100 @@ class TestFormatOnly(unittest.TestCase):
         doc_after = bytes_to_docx(formatted_bytes)
         self.assertEqual(doc_after.tables[0].cell(0, 0).text, "Cell 1")
         self.assertEqual(doc_after.tables[0].cell(1, 1).text, "Cell 4")
-    
+
+    def test_return_text_disabled(self):
+        """Test that text extraction is skipped when return_text is False."""
+        input_bytes = self.create_test_docx("Paragraph one\nParagraph two")
+        formatted_bytes, extracted_text = apply_format_only(input_bytes, "standard_clean", return_text=False)
+
+        self.assertIsNone(extracted_text)
+        self.assertEqual(extract_plain_text(bytes_to_docx(formatted_bytes)), "Paragraph one\nParagraph two")
+
+    def test_batch_matches_single(self):
+        """Test that batch formatting returns the same results as one-by-one calls."""
+        texts = ["First document", "Second document\nWith two lines", "Third document"]
+        inputs = [self.create_test_docx(text) for text in texts]
+
+        results = apply_format_only_batch(inputs, "compact_clean", workers=2)
+
+        self.assertEqual([text for _, text in results], texts)
+        for input_bytes, (formatted_bytes, _) in zip(inputs, results):
+            expected_bytes, _ = apply_format_only(input_bytes, "compact_clean")
+            with zipfile.ZipFile(io.BytesIO(formatted_bytes)) as got, \
+                    zipfile.ZipFile(io.BytesIO(expected_bytes)) as expected:
+                self.assertEqual(got.read('word/document.xml'), expected.read('word/document.xml'))
+
+    def test_already_formatted_document_returned_unchanged(self):
+        """Test that re-running the same profile returns the input as-is."""
+        input_bytes = self.create_test_docx("Formatted once\nSecond line")
+        formatted_bytes, _ = apply_format_only(input_bytes, "standard_clean")
+
+        again_bytes, extracted_text = apply_format_only(formatted_bytes, "standard_clean")
+
+        self.assertIs(again_bytes, formatted_bytes)
+        self.assertEqual(extracted_text, "Formatted once\nSecond line")
+
+    def test_edited_formatted_document_reformatted(self):
+        """Test that edits made after formatting invalidate the marker."""
+        formatted_bytes, _ = apply_format_only(self.create_test_docx("Original"), "standard_clean")
+        doc = bytes_to_docx(formatted_bytes)
+        doc.add_paragraph("Added later").runs[0].font.name = "Arial"
+
+        reformatted_bytes, _ = apply_format_only(docx_to_bytes(doc), "standard_clean")
+
+        doc_after = bytes_to_docx(reformatted_bytes)
+        self.assertEqual(doc_after.paragraphs[-1].runs[0].font.name, "Calibri")
+        with zipfile.ZipFile(io.BytesIO(reformatted_bytes)) as zf:
+            marker_parts = [n for n in zf.namelist() if b'docfmt:' in zf.read(n)]
+        self.assertEqual(len(marker_parts), 1)
+
+    def test_marker_leaves_document_properties_alone(self):
+        """Test that the format marker adds no core properties or keywords."""
+        doc = Document()
+        doc.add_paragraph("No core properties")
+        package_rels = doc.part.package.rels
+        package_rels.pop(next(
+            rId for rId, rel in package_rels.items() if rel.reltype.endswith('/core-properties')
+        ))
+        input_bytes = docx_to_bytes(doc)
+        with zipfile.ZipFile(io.BytesIO(input_bytes)) as zf:
+            self.assertNotIn('docProps/core.xml', zf.namelist())
+
+        formatted_bytes, _ = apply_format_only(input_bytes, "standard_clean")
+
+        with zipfile.ZipFile(io.BytesIO(formatted_bytes)) as zf:
+            self.assertNotIn('docProps/core.xml', zf.namelist())
+            self.assertNotIn(b'docfmt:', zf.read('word/document.xml'))
+        again_bytes, _ = apply_format_only(formatted_bytes, "standard_clean")
+        self.assertIs(again_bytes, formatted_bytes)
+
+    def test_stream_input(self):
+        """Test that a binary stream is accepted in place of bytes."""
+        input_bytes = self.create_test_docx("Streamed paragraph\nSecond line")
+        formatted_bytes, extracted_text = apply_format_only(io.BytesIO(input_bytes), "standard_clean")
+
+        self.assertEqual(extracted_text, "Streamed paragraph\nSecond line")
+        self.assertEqual(extract_plain_text(bytes_to_docx(formatted_bytes)), extracted_text)
+
+    def test_merged_table_cells_formatted(self):
+        """Test that merged table cells are formatted and keep their text."""
+        doc = Document()
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).merge(table.cell(0, 1)).text = "Wide cell"
+        table.cell(1, 0).text = "Cell 3"
+        table.cell(1, 1).text = "Cell 4"
+
+        input_bytes = docx_to_bytes(doc)
+        formatted_bytes, _ = apply_format_only(input_bytes, "compact_clean")
+
+        table_after = bytes_to_docx(formatted_bytes).tables[0]
+        self.assertEqual(table_after.cell(0, 1).text, "Wide cell")
+        for row in table_after.rows:
+            for cell in row.cells:
+                for run in cell.paragraphs[0].runs:
+                    self.assertEqual(run.font.name, "Calibri")
+                    self.assertEqual(run.font.size, Pt(11))
+
     def test_compact_clean_profile(self):
         """
         Test compact_clean profile applies correct margins and spacing.
@@ -1,16 +1,24 @@
 import functions_framework
 from google.cloud import firestore
 from google.cloud import storage
+from google.api_core import exceptions
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from docx import Document
 from docx.shared import Pt
 import io
 import os
+import re
+import shutil
 import json
 import base64
-import tempfile
+import threading
+import time
 import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger(__name__)
@@ -19,6 +27,7 @@ logger.setLevel(logging.INFO)
 # Lazy initialization to avoid import-time credential errors
 _db_client = None
 _storage_client = None
+_download_pool = None
 
 def get_db():
     """Lazy initialization of Firestore client."""
@@ -34,77 +43,149 @@ def get_storage():
         _storage_client = storage.Client()
     return _storage_client
 
+def get_download_pool():
+    """Lazy initialization of the pool that runs input downloads in the background."""
+    global _download_pool
+    if _download_pool is None:
+        _download_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='download')
+    return _download_pool
+
+# Shared HTTP session so warm instances reuse TCP/TLS connections for
+# Firebase download URLs and OpenAI calls instead of reconnecting per request
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+))
+
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+_OPENAI_HEADERS = {
+    'Authorization': f'Bearer {OPENAI_API_KEY}',
+    'Content-Type': 'application/json'
+}
+# (connect, read) timeouts so a hanging OpenAI call or input download can't pin
+# the worker (each retry attempt gets its own timeout)
+OPENAI_TIMEOUT = (5, 60)
+DOWNLOAD_TIMEOUT = (5, 60)
 BUCKET_NAME = "documentformatterapp.firebasestorage.app"
+# Firebase download URL up to the doc_id of an outputs/{doc_id}_formatted.docx object
+_OUTPUT_URL_PREFIX = f"https://firebasestorage.googleapis.com/v0/b/{BUCKET_NAME}/o/{quote('outputs/', safe='')}"
+
+# Start of a sentence: beginning of text, or after ., ! or ? plus whitespace
+_SENTENCE_START_RE = re.compile(r'(^|[.!?]\s+)(\w)')
+
+# Minimum seconds between intermediate progress writes for one job
+PROGRESS_MIN_INTERVAL = 1.0
+
+
+class ProgressReporter:
+    """Writes job progress to Firestore, throttling intermediate milestones.
+    
+    State transitions (start/finish) are written immediately. Intermediate
+    progress is written at most once per min_interval: a milestone reported too
+    soon after the last write is held, superseded by any later report, and
+    flushed from a timer once the interval has passed. A fast job that finishes
+    within the interval costs two Firestore writes instead of five, while a slow
+    step still shows the milestone that preceded it.
+    """
+    
+    def __init__(self, doc_ref, min_interval=PROGRESS_MIN_INTERVAL):
+        self._doc_ref = doc_ref
+        self._min_interval = min_interval
+        self._last_write = 0.0
+        self._pending = None
+        self._timer = None
+        self._closed = False
+        # update_time of this reporter's last write, so a later write can be made
+        # conditional on no other run having touched the job since
+        self.last_update_time = None
+        # Serializes timer flushes with handler writes, so a held milestone can
+        # never land after the terminal update
+        self._lock = threading.Lock()
+    
+    def _write(self, fields, option=None):
+        self._pending = None
+        if option is None:
+            result = self._doc_ref.update(fields)
+        else:
+            result = self._doc_ref.update(fields, option=option)
+        self._last_write = time.monotonic()
+        self.last_update_time = result.update_time
+    
+    def _flush(self):
+        with self._lock:
+            self._timer = None
+            if self._pending is not None and not self._closed:
+                try:
+                    self._write(self._pending)
+                except Exception as e:
+                    logger.warning("Could not write held progress update: %s", e)
+    
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def start(self, fields, option=None):
+        """Write the PROCESSING transition immediately, optionally with a write precondition."""
+        with self._lock:
+            self._write(fields, option)
+    
+    def report(self, progress, display_message):
+        """Record an intermediate milestone; written now, or once min_interval has passed."""
+        with self._lock:
+            self._pending = {
+                'progress': progress,
+                'display_message': display_message,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            }
+            wait = self._min_interval - (time.monotonic() - self._last_write)
+            if wait <= 0:
+                self._cancel_timer()
+                self._write(self._pending)
+            elif self._timer is None:
+                self._timer = threading.Timer(wait, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def finish(self, fields):
+        """Write the terminal update immediately; any held milestone is dropped."""
+        with self._lock:
+            self._close()
+            self._write(fields)
+    
+    def close(self):
+        """Drop any held milestone and stop further progress writes."""
+        with self._lock:
+            self._close()
+    
+    def _close(self):
+        self._closed = True
+        self._pending = None
+        self._cancel_timer()
 
 
 @functions_framework.cloud_event
 def process_document_worker(cloud_event):
     doc_id = None
     doc_ref = None
+    progress = None
+    # Last job state this invocation wrote, once it has claimed the job, so the
+    # failure path knows whether FAILED may be written without reading the job
+    last_state = None
     
     try:
-        print(f"Received cloud event type: {type(cloud_event)}")
-        print(f"Cloud event data type: {type(cloud_event.data)}")
-        print(f"Cloud event data: {cloud_event.data}")
+        logger.debug("Cloud event data: %s", cloud_event.data)
         
-        # Handle different Pub/Sub event formats
-        doc_id = None
-        
-        # Format 1: Standard Pub/Sub CloudEvent format
-        if isinstance(cloud_event.data, dict):
-            if "message" in cloud_event.data:
-                message = cloud_event.data["message"]
-                if "data" in message:
-                    try:
-                        # Decode base64 message data
-                        if isinstance(message["data"], str):
-                            pubsub_message = base64.b64decode(message["data"]).decode('utf-8')
-                        else:
-                            pubsub_message = base64.b64decode(message["data"]).decode('utf-8')
-                        print(f"Decoded Pub/Sub message: {pubsub_message}")
-                        message_data = json.loads(pubsub_message)
-                        doc_id = message_data.get('doc_id')
-                        if doc_id:
-                            logger.info(f"WORKER_REV=FORMATTER_V1 doc_id={doc_id}")
-                    except Exception as decode_error:
-                        print(f"Error decoding message: {str(decode_error)}")
-                        raise
-        
-        # Format 2: Direct data access (alternative format)
-        if not doc_id and isinstance(cloud_event.data, dict):
-            if 'doc_id' in cloud_event.data:
-                doc_id = cloud_event.data.get('doc_id')
-                if doc_id:
-                    logger.info(f"WORKER_REV=FORMATTER_V1 doc_id={doc_id}")
-            elif 'data' in cloud_event.data:
-                # Try to parse data field directly
-                try:
-                    data_str = cloud_event.data.get('data')
-                    if isinstance(data_str, str):
-                        message_data = json.loads(data_str)
-                        doc_id = message_data.get('doc_id')
-                        if doc_id:
-                            logger.info(f"WORKER_REV=FORMATTER_V1 doc_id={doc_id}")
-                except:
-                    pass
-        
-        # Format 3: Check if data is a string that needs parsing
-        if not doc_id and isinstance(cloud_event.data, str):
-            try:
-                message_data = json.loads(cloud_event.data)
-                doc_id = message_data.get('doc_id')
-                if doc_id:
-                    logger.info(f"WORKER_REV=FORMATTER_V1 doc_id={doc_id}")
-            except:
-                pass
+        doc_id = extract_doc_id(cloud_event.data)
         
         if not doc_id:
             error_msg = f"Could not extract doc_id from cloud event. Event data: {cloud_event.data}"
-            print(f"Error: {error_msg}")
             raise ValueError(error_msg)
         
-        print(f"Processing job with doc_id: {doc_id}")
+        logger.info("WORKER_REV=FORMATTER_V1 doc_id=%s", doc_id)
+        logger.info("Processing job with doc_id: %s", doc_id)
         
         # Get clients
         db = get_db()
@@ -115,7 +196,7 @@ def process_document_worker(cloud_event):
         doc = doc_ref.get()
         
         if not doc.exists:
-            print(f"Job {doc_id} not found")
+            logger.info("Job %s not found", doc_id)
             return
         
         data = doc.to_dict()
@@ -123,7 +204,7 @@ def process_document_worker(cloud_event):
         # Check current state - ensure idempotency (don't go backwards)
         current_state = data.get('state', 'QUEUED')
         if current_state not in ('QUEUED', 'PROCESSING'):
-            print(f"Job {doc_id} is already in state {current_state}, skipping")
+            logger.info("Job %s is already in state %s, skipping", doc_id, current_state)
             return
         
         storage_path = data.get('storage_path')
@@ -134,59 +215,59 @@ def process_document_worker(cloud_event):
         style = data.get('style') or data.get('profile', 'standard_clean')
         
         # Log job fields
-        logger.info(f"MODE={mode} STYLE={style} STORAGE_PATH={storage_path}")
+        logger.info("MODE=%s STYLE=%s STORAGE_PATH=%s", mode, style, storage_path)
         
         if not storage_path:
             raise ValueError("Missing storage_path in job data")
         
-        # Update to PROCESSING state with progress
-        doc_ref.update({
-            'state': 'PROCESSING',
-            'status': 'PROCESSING',  # Alias (keep identical to state)
-            'progress': 5,
-            'display_message': 'Processing',
-            'updated_at': firestore.SERVER_TIMESTAMP
-        })
-        
-        # Step 1: Download document (progress: 20%)
-        doc_ref.update({
-            'progress': 20,
-            'display_message': 'Downloading document',
-            'updated_at': firestore.SERVER_TIMESTAMP
-        })
-        
-        # Download the DOCX file
+        # Start downloading the DOCX file now so the GCS read overlaps the
+        # PROCESSING write below; the bytes are only used once the claim succeeds
         # Note: Download exceptions are preserved as-is (not converted to "empty document" errors)
         obj_path = normalize_storage_path(storage_path)
-        bucket = storage_client.bucket(BUCKET_NAME)
-        blob = bucket.blob(obj_path)
+        blob = storage_client.bucket(BUCKET_NAME).blob(obj_path)
+        download_future = get_download_pool().submit(blob.download_as_bytes)
+        
+        # Claim the job: move to PROCESSING only if it is unchanged since the read
+        # above, so two deliveries reading the same state can't both claim it. This
+        # does not stop a redelivery that reads the job after our claim (progress
+        # writes are throttled); the FAILED write below is guarded for that case.
+        progress = ProgressReporter(doc_ref)
+        try:
+            progress.start({
+                'state': 'PROCESSING',
+                'status': 'PROCESSING',  # Alias (keep identical to state)
+                'progress': 5,
+                'display_message': 'Processing',
+                'updated_at': firestore.SERVER_TIMESTAMP
+            }, option=db.write_option(last_update_time=doc.update_time))
+        except exceptions.FailedPrecondition:
+            logger.info("Job %s was modified concurrently, skipping", doc_id)
+            return
+        last_state = 'PROCESSING'
         
-        if not blob.exists():
-            raise ValueError(f"File not found at storage path: {storage_path}")
+        # Step 1: Download document (progress: 20%)
+        progress.report(20, 'Downloading document')
         
-        # Download as bytes
-        input_docx_bytes = blob.download_as_bytes()
+        # Wait for the download; a missing object surfaces as NotFound on the
+        # download itself, so no separate exists() round-trip is needed
+        try:
+            input_docx_bytes = download_future.result()
+        except exceptions.NotFound as e:
+            raise ValueError(f"File not found at storage path: {storage_path}") from e
         
         # Step 2: Process based on mode (progress: 50%)
-        doc_ref.update({
-            'progress': 50,
-            'display_message': 'Formatting your document',
-            'updated_at': firestore.SERVER_TIMESTAMP
-        })
+        progress.report(50, 'Formatting your document')
         
         if mode == 'format_only':
             # Format-only mode: preserve text, apply formatting
             # Note: No empty text validation for format_only - proceed even if document is empty
             from formatting.formatter_engine import apply_format_only
-            logger.info("FORMAT_ONLY: apply_format_only invoked")
-            try:
-                output_bytes, formatted_text = apply_format_only(input_docx_bytes, style)
-            except Exception as format_error:
-                print(f"Error in format_only processing: {str(format_error)}")
-                raise
+            logger.debug("FORMAT_ONLY: apply_format_only invoked")
+            output_bytes, formatted_text = apply_format_only(input_docx_bytes, style)
         else:
             # Legacy mode: extract text, format text, create new DOCX
-            extracted_text = download_and_extract_text(storage_path)
+            # (from the bytes already downloaded above, not a second download)
+            extracted_text = _extract_text(input_docx_bytes)
             
             # Only validate text content for non-format_only flows
             if not extracted_text or not extracted_text.strip():
@@ -194,26 +275,26 @@ def process_document_worker(cloud_event):
             
             formatted_text = format_text_basic(extracted_text, style_prompt)
             
-            # Generate formatted DOCX
+            # Generate formatted DOCX; the font is set once on the Normal style,
+            # which every added paragraph inherits, instead of on each run
             formatted_doc = Document()
+            normal_font = formatted_doc.styles['Normal'].font
+            normal_font.name = 'Times New Roman'
+            normal_font.size = Pt(12)
             for line in formatted_text.split('\n'):
                 if line.strip():
-                    p = formatted_doc.add_paragraph(line)
-                    for run in p.runs:
-                        run.font.name = 'Times New Roman'
-                        run.font.size = Pt(12)
+                    formatted_doc.add_paragraph(line)
             
-            output_buffer = io.BytesIO()
-            formatted_doc.save(output_buffer)
-            output_buffer.seek(0)
-            output_bytes = output_buffer.getvalue()
+            from formatting.docx_utils import docx_to_bytes
+            output_bytes = docx_to_bytes(formatted_doc)
+        
+        # The input is not needed past this point; drop it (and the download
+        # future, which also holds it) so its buffer can be reclaimed while the
+        # output is uploaded
+        del input_docx_bytes, download_future
         
         # Step 3: Upload to Cloud Storage (progress: 90%)
-        doc_ref.update({
-            'progress': 90,
-            'display_message': 'Uploading formatted document',
-            'updated_at': firestore.SERVER_TIMESTAMP
-        })
+        progress.report(90, 'Uploading formatted document')
         
         # Use output path format: outputs/{docId}_formatted.docx
         object_path = f'outputs/{doc_id}_formatted.docx'
@@ -221,35 +302,29 @@ def process_document_worker(cloud_event):
         bucket = storage_client.bucket(BUCKET_NAME)
         blob = bucket.blob(object_path)
         
+        # Set metadata with download token before upload, so it is sent with the
+        # upload request itself (no separate patch/reload round-trips)
+        blob.metadata = {"firebaseStorageDownloadTokens": token}
+        
         # Upload using upload_from_string (NOT upload_from_file)
         blob.upload_from_string(
             output_bytes,
             content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
         )
         
-        # Set metadata with download token after upload
-        blob.metadata = {"firebaseStorageDownloadTokens": token}
-        
-        # Ensure metadata persisted
-        blob.patch()
-        
-        # Verify metadata was set (reload blob)
-        blob.reload()
-        
         # Construct Firebase download URL (NO signed URLs - Firebase token URL only)
-        from urllib.parse import quote
-        encoded = quote(object_path, safe="")
-        download_url = f"https://firebasestorage.googleapis.com/v0/b/{BUCKET_NAME}/o/{encoded}?alt=media&token={token}"
+        # Only doc_id varies; it is still encoded since clients may supply it
+        download_url = f"{_OUTPUT_URL_PREFIX}{quote(doc_id, safe='')}_formatted.docx?alt=media&token={token}"
         
         # RUNTIME TRIPWIRE: Detect any signed URLs (forbidden)
         if "generate_signed" in str(download_url) or "X-Goog-Signature" in str(download_url):
             raise RuntimeError("SIGNED URL DETECTED - forbidden")
         
         # Log download URL for debugging
-        print(f"DOWNLOAD_URL= {download_url}")
+        logger.debug("DOWNLOAD_URL= %s", download_url)
         
         # Update to COMPLETED state with all required fields including download_url
-        doc_ref.update({
+        progress.finish({
             'state': 'COMPLETED',
             'status': 'COMPLETED',  # Alias (keep identical to state)
             'progress': 100,
@@ -259,62 +334,92 @@ def process_document_worker(cloud_event):
             'error': None,
             'updated_at': firestore.SERVER_TIMESTAMP
         })
+        last_state = 'COMPLETED'
         
-        print(f"Job {doc_id} completed successfully")
+        logger.info("Job %s completed successfully", doc_id)
         
     except Exception as e:
         error_msg = str(e)
-        import traceback
-        full_traceback = traceback.format_exc()
-        
-        print(f"ERROR processing job {doc_id if doc_id else 'unknown'}: {error_msg}")
-        print(f"Full traceback:\n{full_traceback}")
-        
-        # Try to update Firestore with error, even if doc_id/doc_ref aren't set
-        if doc_id:
+        # Stop held progress updates so none lands after the FAILED write
+        if progress is not None:
+            progress.close()
+        # Traceback is attached to the log record once, formatted only when emitted
+        logger.exception("ERROR processing job %s: %s", doc_id or 'unknown', error_msg)
+        
+        # Try to update Firestore with error, even if doc_id/doc_ref aren't set.
+        # Once this run has claimed the job, the locally tracked state says whether
+        # it already made the job terminal, so no read is needed; the write is
+        # conditional on this run's own last write time. Before the claim
+        # (or if it failed) another delivery may own the job, so read it first and
+        # only write FAILED if it is still unchanged and not terminal.
+        if doc_id and last_state == 'COMPLETED':
+            logger.info("Job %s already completed, not marking as failed", doc_id)
+        elif doc_id:
+            failed_fields = {
+                'state': 'FAILED',
+                'status': 'FAILED',  # Alias (keep identical to state)
+                'display_message': 'Failed',
+                'error': error_msg,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            }
             try:
-                if doc_ref:
-                    # Check current state to avoid going backwards
-                    try:
-                        current_doc = doc_ref.get()
-                        if current_doc.exists:
-                            current_data = current_doc.to_dict()
-                            current_state = current_data.get('state', 'QUEUED')
-                            # Only update if not already in a terminal state
-                            if current_state not in ('COMPLETED', 'FAILED'):
-                                doc_ref.update({
-                                    'state': 'FAILED',
-                                    'status': 'FAILED',  # Alias (keep identical to state)
-                                    'display_message': 'Failed',
-                                    'error': error_msg,
-                                    'updated_at': firestore.SERVER_TIMESTAMP
-                                })
-                    except:
-                        # Fallback: try to update anyway
-                        doc_ref.update({
-                            'state': 'FAILED',
-                            'status': 'FAILED',  # Alias (keep identical to state)
-                            'display_message': 'Failed',
-                            'error': error_msg,
-                            'updated_at': firestore.SERVER_TIMESTAMP
-                        })
-                else:
-                    # Create doc_ref if we have doc_id but doc_ref wasn't created
+                db = get_db()
+                if doc_ref is None:
                     doc_ref = db.collection('jobs').document(doc_id)
-                    doc_ref.update({
-                        'state': 'FAILED',
-                        'status': 'FAILED',  # Alias (keep identical to state)
-                        'display_message': 'Failed',
-                        'error': error_msg,
-                        'updated_at': firestore.SERVER_TIMESTAMP
-                    })
-                print(f"Updated Firestore with error for doc_id: {doc_id}")
+                if last_state is not None:
+                    # Only if nothing but this run has written the job since its last
+                    # write; otherwise another run owns it (and may have completed it)
+                    doc_ref.update(
+                        failed_fields,
+                        option=db.write_option(last_update_time=progress.last_update_time)
+                    )
+                    logger.debug("Updated Firestore with error for doc_id: %s", doc_id)
+                else:
+                    current_doc = doc_ref.get()
+                    current_state = current_doc.to_dict().get('state', 'QUEUED') if current_doc.exists else None
+                    if current_state in ('COMPLETED', 'FAILED', None):
+                        logger.info("Job %s is in state %s, not marking as failed", doc_id, current_state)
+                    else:
+                        doc_ref.update(
+                            failed_fields,
+                            option=db.write_option(last_update_time=current_doc.update_time)
+                        )
+                        logger.debug("Updated Firestore with error for doc_id: %s", doc_id)
+            except exceptions.FailedPrecondition:
+                logger.info("Job %s was modified concurrently, not marking as failed", doc_id)
             except Exception as update_error:
-                print(f"CRITICAL: Failed to update job status in Firestore: {str(update_error)}")
-                print(f"Update error traceback:\n{traceback.format_exc()}")
+                logger.critical("CRITICAL: Failed to update job status in Firestore: %s", update_error)
         else:
-            print(f"CRITICAL: Cannot update Firestore - doc_id is None. Error: {error_msg}")
-            print(f"This means the error occurred before doc_id could be extracted from the Pub/Sub message.")
+            logger.critical("CRITICAL: Cannot update Firestore - doc_id is None. Error: %s", error_msg)
+            logger.critical("This means the error occurred before doc_id could be extracted from the Pub/Sub message.")
+
+
+def extract_doc_id(event_data):
+    """
+    Extract doc_id from a Pub/Sub CloudEvent payload.
+    The standard envelope ({"message": {"data": <base64 JSON>}}) is decoded
+    first; if it carries no doc_id, a root "doc_id", a JSON "data" string or a
+    JSON string body are tried in turn. Returns None if no doc_id is found.
+    """
+    try:
+        doc_id = json.loads(base64.b64decode(event_data["message"]["data"])).get('doc_id')
+        if doc_id:
+            return doc_id
+    except (KeyError, TypeError, AttributeError):
+        pass
+    
+    # Fallbacks for non-standard envelopes
+    try:
+        if isinstance(event_data, str):
+            return json.loads(event_data).get('doc_id')
+        if 'doc_id' in event_data:
+            return event_data.get('doc_id')
+        data_str = event_data.get('data')
+        if isinstance(data_str, str):
+            return json.loads(data_str).get('doc_id')
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return None
 
 
 def normalize_storage_path(value):
@@ -328,133 +433,69 @@ def normalize_storage_path(value):
         return value
     
     # Handle HTTP/HTTPS URLs (Firebase Storage URLs)
-    if value.startswith('http://') or value.startswith('https://'):
-        try:
-            from urllib.parse import unquote, urlparse, parse_qs
-            # Extract path after "/o/"
-            if '/o/' in value:
-                # Get the part after "/o/"
-                parts = value.split('/o/', 1)
-                if len(parts) == 2:
-                    # Get path before query string
-                    path_part = parts[1].split('?')[0]
-                    # URL decode
-                    obj_path = unquote(path_part)
-                    return obj_path
-            # Fallback: try to parse as URL
-            parsed = urlparse(value)
-            if '/o/' in parsed.path:
-                path_part = parsed.path.split('/o/', 1)[1]
-                obj_path = unquote(path_part)
-                return obj_path
-            # If no /o/ found, return as-is (might be direct download URL)
-            return value
-        except Exception as e:
-            print(f"Warning: Could not normalize HTTP URL {value}: {e}")
+    if value.startswith(('http://', 'https://')):
+        idx = value.find('/o/')
+        if idx < 0:
+            # No /o/ found, return as-is (might be direct download URL)
             return value
+        # Object path is after "/o/" and before the query string, URL-encoded
+        return unquote(value[idx + 3:].split('?', 1)[0])
     
-    # Handle gs:// URLs
-    elif value.startswith('gs://'):
-        # Strip "gs://<bucket>/" -> object path
-        parts = value.replace('gs://', '').split('/', 1)
-        if len(parts) == 2:
-            # Return just the object path (skip bucket name)
-            return parts[1]
-        else:
-            # Invalid format, return as-is
-            return value
+    # Handle gs:// URLs: strip "gs://<bucket>/" -> object path
+    if value.startswith('gs://'):
+        idx = value.find('/', 5)
+        # Invalid format (no object path), return as-is
+        return value[idx + 1:] if idx >= 0 else value
     
     # Else: return as-is
     return value
 
 
+def _download_bytes(storage_path):
+    """Download a file as bytes. Supports gs://, Firebase HTTPS URLs and default-bucket paths."""
+    # Handle Firebase HTTPS URLs - use the shared HTTP session
+    if storage_path.startswith('http://') or storage_path.startswith('https://'):
+        response = _session.get(storage_path, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        response.raise_for_status()
+        
+        # Buffer the download in memory, copying from the raw stream in 1 MB
+        # blocks; decode_content keeps gzip/deflate transfer encoding handled
+        response.raw.decode_content = True
+        buffer = io.BytesIO()
+        shutil.copyfileobj(response.raw, buffer, length=1 << 20)
+        return buffer.getvalue()
+    
+    # Handle gs:// URLs - use storage client
+    if storage_path.startswith('gs://'):
+        parts = storage_path.replace('gs://', '').split('/', 1)
+        if len(parts) != 2:
+            raise ValueError(f"Invalid gs:// URL format: {storage_path}")
+        bucket_name, blob_name = parts
+    else:
+        # Assume it's a relative path in default bucket
+        bucket_name, blob_name = BUCKET_NAME, storage_path
+    
+    blob = get_storage().bucket(bucket_name).blob(blob_name)
+    try:
+        # A missing object surfaces as NotFound on the download itself,
+        # so no separate exists() round-trip is needed
+        return blob.download_as_bytes()
+    except exceptions.NotFound as e:
+        raise ValueError(f"File not found at storage path: {storage_path}") from e
+
+
+def _extract_text(docx_bytes):
+    """Extract non-empty paragraph text from DOCX bytes, separated by blank lines."""
+    doc = Document(io.BytesIO(docx_bytes))
+    return '\n\n'.join(text for text in (para.text for para in doc.paragraphs) if text.strip())
+
+
 def download_and_extract_text(storage_path):
     """Download .docx file and extract text. Supports gs:// and Firebase HTTPS URLs."""
     try:
-        # Handle gs:// URLs - use storage client
-        if storage_path.startswith('gs://'):
-            storage_client = get_storage()
-            # Parse gs:// URL
-            parts = storage_path.replace('gs://', '').split('/', 1)
-            if len(parts) != 2:
-                raise ValueError(f"Invalid gs:// URL format: {storage_path}")
-            bucket_name = parts[0]
-            blob_name = parts[1]
-            
-            bucket = storage_client.bucket(bucket_name)
-            blob = bucket.blob(blob_name)
-            
-            if not blob.exists():
-                raise ValueError(f"File not found at path: {blob_name}")
-            
-            # Download as bytes
-            file_bytes = blob.download_as_bytes()
-            
-            # Save to temp file
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                tmp_path = tmp.name
-                tmp.write(file_bytes)
-                tmp.flush()
-            
-            # Extract text using python-docx
-            doc = Document(tmp_path)
-            text = '\n\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
-            
-            # Clean up temp file
-            os.unlink(tmp_path)
-            return text
-        
-        # Handle Firebase HTTPS URLs - use requests
-        elif storage_path.startswith('http://') or storage_path.startswith('https://'):
-            # Download file as binary using requests
-            response = requests.get(storage_path, stream=True)
-            response.raise_for_status()
-            
-            # Save to temp file
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                tmp_path = tmp.name
-                for chunk in response.iter_content(chunk_size=8192):
-                    tmp.write(chunk)
-                tmp.flush()
-            
-            # Extract text using python-docx
-            doc = Document(tmp_path)
-            text = '\n\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
-            
-            # Clean up temp file
-            os.unlink(tmp_path)
-            return text
-        
-        else:
-            # Assume it's a relative path in default bucket
-            storage_client = get_storage()
-            bucket = storage_client.bucket(BUCKET_NAME)
-            blob = bucket.blob(storage_path)
-            
-            if not blob.exists():
-                raise ValueError(f"File not found at path: {storage_path}")
-            
-            # Download as bytes
-            file_bytes = blob.download_as_bytes()
-            
-            # Save to temp file
-            with tempfile.NamedTemporaryFile(suffix='.docx', delete=False) as tmp:
-                tmp_path = tmp.name
-                tmp.write(file_bytes)
-                tmp.flush()
-            
-            # Extract text using python-docx
-            doc = Document(tmp_path)
-            text = '\n\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
-            
-            # Clean up temp file
-            os.unlink(tmp_path)
-            return text
-                
+        return _extract_text(_download_bytes(storage_path))
     except Exception as e:
-        print(f"Error downloading/extracting text from {storage_path}: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error downloading/extracting text from %s: %s", storage_path, e)
         return None
 
 
@@ -466,35 +507,13 @@ def format_text_basic(text, style_prompt):
     if not text or not text.strip():
         return text
     
-    # Split into paragraphs
-    paragraphs = text.split('\n\n')
-    formatted_paragraphs = []
-    
-    for para in paragraphs:
-        para = para.strip()
-        if not para:
-            continue
-        
-        # Ensure sentences start with capital letter
-        sentences = para.split('. ')
-        formatted_sentences = []
-        for i, sentence in enumerate(sentences):
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-            
-            # Capitalize first letter of sentence
-            if sentence and not sentence[0].isupper():
-                sentence = sentence[0].upper() + sentence[1:] if len(sentence) > 1 else sentence.upper()
-            
-            # Add period if missing (except last sentence if it already has one)
-            if i < len(sentences) - 1 and not sentence.endswith('.'):
-                sentence += '.'
-            
-            formatted_sentences.append(sentence)
-        
-        formatted_para = '. '.join(formatted_sentences)
-        formatted_paragraphs.append(formatted_para)
+    # Strip paragraphs, drop empty ones, and capitalize each sentence start in
+    # one regex pass per paragraph
+    formatted_paragraphs = (
+        _SENTENCE_START_RE.sub(_capitalize_match, para)
+        for para in (p.strip() for p in text.split('\n\n'))
+        if para
+    )
     
     # Join paragraphs with double newline
     result = '\n\n'.join(formatted_paragraphs)
@@ -506,13 +525,13 @@ def format_text_basic(text, style_prompt):
     return result
 
 
+def _capitalize_match(match):
+    """Upper-case the first character of a _SENTENCE_START_RE match."""
+    return match.group(1) + match.group(2).upper()
+
+
 def format_with_openai(text, style_prompt):
     """OpenAI formatting (kept for future use, not used in V1)."""
-    headers = {
-        'Authorization': f'Bearer {OPENAI_API_KEY}',
-        'Content-Type': 'application/json'
-    }
-    
     payload = {
         'model': 'gpt-4o-mini',
         'messages': [
@@ -522,7 +541,12 @@ def format_with_openai(text, style_prompt):
         'temperature': 0.3
     }
     
-    response = requests.post('https://api.openai.com/v1/chat/completions', headers=headers, json=payload )
+    response = _session.post(
+        'https://api.openai.com/v1/chat/completions',
+        headers=_OPENAI_HEADERS,
+        json=payload,
+        timeout=OPENAI_TIMEOUT
+    )
     response.raise_for_status()
     
     return response.json()['choices'][0]['message']['content']